@@ -2,70 +2,257 @@
  Function: Parse the bib file, query the citations, and output the xlsx file.
  Usage   : python3 bibParse.py xxx.bib yyy.xlsx
 """
-import requests
-import json
+import asyncio
+import aiohttp
 import bibtexparser
-import openpyxl
+import csv
+import json
+import orjson
+import os
+import re
 import sys
+import time
+import xlsxwriter
+from tqdm import tqdm
+
+API_BASE = "https://api.semanticscholar.org/graph/v1"
+
+# 并发请求数上限，避免触发Semantic Scholar限流
+MAX_CONCURRENCY = 8
+# /paper/batch接口单次最多接受500个paperId
+BATCH_SIZE = 500
+
+# 本地缓存，重复运行时不再查询已知的文献
+CACHE_PATH = os.path.expanduser("~/.cache/bibparse/citations.json")
+CACHE_TTL = 90 * 24 * 3600  # 90天过期
+
+# 后续流程只用到这些字段，解析后其余字段直接丢弃以减少内存
+KEEP_FIELDS = ('title', 'year', 'author', 'journal', 'doi')
+
+# bib标题里常见的大括号和标点，规整时一并去掉
+_TITLE_PUNCT_RE = re.compile(r'[{}"\'.,:;!?()\[\]]')
+
+# 函数：规整标题，小写、去大括号和标点、压缩空白，
+# 同一篇文献的预印本/正式版条目会得到相同的键
+def normalize_title(title):
+    return ' '.join(_TITLE_PUNCT_RE.sub(' ', title.lower()).split())
+
+# 函数：生成缓存键，优先用DOI，否则用规整后的标题
+def cache_key(entry):
+    doi = entry.get('doi')
+    if doi:
+        return doi.lower()
+    return normalize_title(entry.get('title', 'N/A'))
 
-# 函数：查询文献被引用次数
-def get_citation_count(title):
-    url = "https://api.semanticscholar.org/graph/v1/paper/search"
+# 函数：读取本地缓存
+def load_cache():
+    try:
+        with open(CACHE_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# 函数：原子写回本地缓存（先写临时文件再替换）
+def save_cache(cache):
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, CACHE_PATH)
+
+# 函数：读取上次运行中断时留下的进度文件，补种到缓存里，
+# 这样崩溃后重跑只需查询剩下的文献
+def load_partial(path, cache):
+    try:
+        with open(path, 'r', newline='') as f:
+            for row in csv.reader(f):
+                key, count, ts = row
+                if key not in cache:
+                    cache[key] = {'count': int(count), 'ts': float(ts)}
+    except (OSError, ValueError):
+        pass
+
+# 函数：逐条读取.bib文件，按@记录切分，不把整个文件载入内存
+def iter_bib_records(path):
+    record = []
+    with open(path, 'r') as bib_file:
+        for line in bib_file:
+            if line.lstrip().startswith('@') and record:
+                yield ''.join(record)
+                record = []
+            record.append(line)
+    if record:
+        yield ''.join(record)
+
+# 函数：在后台线程里边解析边把文献塞进队列，结束时放入None哨兵；
+# 哨兵必须在finally里投递，否则解析线程抛异常时主协程会永远等在队列上，
+# 异常本身由main()里的await parse_task重新抛出
+def parse_bib_into_queue(loop, queue, bib):
+    try:
+        for record in iter_bib_records(bib):
+            parser = bibtexparser.bparser.BibTexParser(
+                common_strings=False, homogenize_fields=False,
+                ignore_nonstandard_types=True)
+            for entry in bibtexparser.loads(record, parser=parser).entries:
+                slim = {k: entry[k] for k in KEEP_FIELDS if k in entry}
+                loop.call_soon_threadsafe(queue.put_nowait, slim)
+    finally:
+        loop.call_soon_threadsafe(queue.put_nowait, None)
+
+# 函数：把文献解析成Semantic Scholar的paperId，bib里带DOI的无需查询
+async def resolve_paper_id(session, entry):
+    doi = entry.get('doi')
+    if doi:
+        return f"DOI:{doi}"
     params = {
-        'query': title,
-        'fields': 'title,citationCount',
+        'query': entry.get('title', 'N/A'),
+        'fields': 'paperId',
         'limit': 1
     }
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        if data['data']:
-            return data['data'][0].get('citationCount', 0)
-    return 0
-
-if len(sys.argv) < 1:
-    bib = "references.bib"
-else:
-	bib = sys.argv[1]
-
-if len(sys.argv) < 2:
-	xlsx = "output.xlsx"
-else:
-    xlsx = sys.argv[2]
-
-# 读取.bib文件
-with open(bib, 'r') as bib_file:
-    bib_database = bibtexparser.load(bib_file)
-
-print(f"Excel file {bib} has been read.")
-
-# 创建Excel文件
-wb = openpyxl.Workbook()
-ws = wb.active
-ws.title = "Citations"
-ws.append(["Title", "Year", "First Author", "Journal", "Citations"])
-
-i = 1
-
-# 遍历.bib中的每篇文献
-for entry in bib_database.entries:
-    title = entry.get('title', 'N/A')
-    year = entry.get('year', 'N/A')
-    author = entry.get('author', 'N/A').split(' and ')[0]  # 取第一个作者
-    journal = entry.get('journal', 'N/A')
-    
-    print(f"Querying {i} entry...")
-
-    # 获取被引用次数
-    citations = get_citation_count(title)
-    
-    # 将信息写入Excel文件
-    ws.append([title, year, author, journal, citations])
-
-    i += 1
-
-# 保存Excel文件
-wb.save(xlsx)
-
-print(f"Excel file {xlsx} has been created.")
+    async with session.get(f"{API_BASE}/paper/search", params=params) as response:
+        if response.status == 200:
+            data = orjson.loads(await response.read())
+            if data['data']:
+                return data['data'][0].get('paperId')
+    return None
+
+# 函数：批量查询文献被引用次数，每次最多500篇；
+# 每完成一批就通过on_chunk回调上报，便于及时落盘
+async def get_citation_counts(session, paper_ids, on_chunk=None):
+    counts = {}
+    ids = [pid for pid in paper_ids if pid]
+    for start in range(0, len(ids), BATCH_SIZE):
+        chunk = ids[start:start + BATCH_SIZE]
+        async with session.post(f"{API_BASE}/paper/batch",
+                                params={'fields': 'citationCount,title'},
+                                json={'ids': chunk}) as response:
+            if response.status != 200:
+                continue
+            chunk_counts = {}
+            for pid, paper in zip(chunk, orjson.loads(await response.read())):
+                if paper:
+                    chunk_counts[pid] = paper.get('citationCount', 0)
+            counts.update(chunk_counts)
+            if on_chunk:
+                on_chunk(chunk_counts)
+    return counts
+
+async def main():
+    if len(sys.argv) < 2:
+        bib = "references.bib"
+    else:
+        bib = sys.argv[1]
+
+    if len(sys.argv) < 3:
+        xlsx = "output.xlsx"
+    else:
+        xlsx = sys.argv[2]
+
+    cache = load_cache()
+    # 崩溃重跑时，上次的进度文件里已有的结果不再重新查询
+    partial_path = xlsx + ".partial.csv"
+    load_partial(partial_path, cache)
+    now = time.time()
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    # 单个进度条按固定频率刷新，代替逐条print刷屏
+    pbar = tqdm(desc="Resolving", unit="ref")
+
+    async def resolve_one(entry):
+        async with sem:
+            paper_id = await resolve_paper_id(session, entry)
+        pbar.update(1)
+        return paper_id
+
+    # 后台线程流式解析.bib，主协程边收文献边发起paperId解析请求
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    parse_task = loop.run_in_executor(None, parse_bib_into_queue, loop, queue, bib)
+
+    entries = []
+    citations_by_key = {}
+    misses = []
+    resolve_tasks = []
+    scheduled_keys = set()
+
+    async with aiohttp.ClientSession() as session:
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                break
+            entries.append(entry)
+            key = cache_key(entry)
+            cached = cache.get(key)
+            if cached and now - cached['ts'] < CACHE_TTL:
+                citations_by_key[key] = cached['count']
+            elif key not in scheduled_keys:
+                # 重复条目（如预印本+正式版）只查询一次
+                scheduled_keys.add(key)
+                misses.append(entry)
+                resolve_tasks.append(asyncio.ensure_future(resolve_one(entry)))
+        await parse_task
+
+        print(f"Bib file {bib} has been read.")
+        print(f"Querying {len(misses)} of {len(entries)} entries "
+              f"({len(entries) - len(misses)} cached)...")
+
+        pbar.total = len(resolve_tasks)
+        paper_ids = await asyncio.gather(*resolve_tasks)
+        pbar.close()
+
+        # 每查到一批就把结果追加进进度文件并flush，
+        # 中途崩溃时已完成的查询不会丢失
+        key_by_pid = {pid: cache_key(entry)
+                      for entry, pid in zip(misses, paper_ids) if pid}
+        partial_file = open(partial_path, 'a', newline='')
+        partial_writer = csv.writer(partial_file)
+
+        def on_chunk(chunk_counts):
+            for pid, count in chunk_counts.items():
+                partial_writer.writerow([key_by_pid[pid], count, now])
+            partial_file.flush()
+
+        # 批量请求拿到所有被引用次数
+        counts = await get_citation_counts(session, paper_ids, on_chunk)
+        partial_file.close()
+
+    if misses:
+        # 只有批量接口真正返回了结果的文献才写入缓存；
+        # 解析失败或请求失败的不缓存，留给下次运行重试
+        for entry, paper_id in zip(misses, paper_ids):
+            if paper_id not in counts:
+                continue
+            key = cache_key(entry)
+            count = counts[paper_id]
+            citations_by_key[key] = count
+            cache[key] = {'count': count, 'ts': now}
+
+        save_cache(cache)
+
+    # 创建Excel文件，constant_memory模式逐行落盘，内存占用与行数无关
+    wb = xlsxwriter.Workbook(xlsx, {'constant_memory': True})
+    ws = wb.add_worksheet("Citations")
+    ws.write_row(0, 0, ["Title", "Year", "First Author", "Journal", "Citations"])
+
+    # 遍历.bib中的每篇文献，按原始顺序写入查询结果
+    for row, entry in enumerate(entries, start=1):
+        title = entry.get('title', 'N/A')
+        year = entry.get('year', 'N/A')
+        author = entry.get('author', 'N/A').split(' and ')[0]  # 取第一个作者
+        journal = entry.get('journal', 'N/A')
+        citations = citations_by_key.get(cache_key(entry), 0)
+        ws.write_row(row, 0, [title, year, author, journal, citations])
+
+    # 保存Excel文件
+    wb.close()
+
+    # 成功跑完后进度文件不再需要（结果已进缓存和xlsx）
+    try:
+        os.remove(partial_path)
+    except OSError:
+        pass
+
+    print(f"Excel file {xlsx} has been created.")
 
+if __name__ == "__main__":
+    asyncio.run(main())
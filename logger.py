@@ -6,7 +6,6 @@
 import sys
 import time
 import os
-import inspect
 
 DEBUG, INFO, WARN, ERROR, FATAL = range(5)
 
@@ -17,8 +16,31 @@ COLOR_WARN = "\033[33m"
 COLOR_ERROR = "\033[31m"
 COLOR_FATAL = "\033[41;37m"
 
+# 按级别索引的名称和颜色表，省去每条日志的字典查找
+_LEVEL_NAMES = ("DEBUG", "INFO", "WARN", "ERROR", "FATAL")
+_LEVEL_COLORS = (COLOR_DEBUG, COLOR_INFO, COLOR_WARN, COLOR_ERROR, COLOR_FATAL)
+
+# 低于该级别的日志直接丢弃，不做任何格式化工作
+_LEVEL = DEBUG
+
+def set_level(level):
+    global _LEVEL
+    _LEVEL = level
+
+# 同一秒内的日志共享时间字符串，免去每条日志一次strftime
+_LAST_SEC = 0
+_LAST_TIME_STR = ""
+
 def get_current_time():
-    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+    global _LAST_SEC, _LAST_TIME_STR
+    now = int(time.time())
+    if now != _LAST_SEC:
+        _LAST_SEC = now
+        _LAST_TIME_STR = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+    return _LAST_TIME_STR
+
+# 日志前缀模板，一次format代替多段字符串拼接
+_PREFIX_TEMPLATE = "{ts} {file}:{func}():{line} {lvl} {color}| "
 
 class LogStream:
     def __init__(self, level, file, line, func):
@@ -26,59 +48,62 @@ class LogStream:
         self._file = file
         self._line = line
         self._func = func
-        self._stream = sys.stderr
 
         # 构建日志信息
-        log_message = f"{get_current_time()} {os.path.basename(file)}:{func}():{line} "
-        log_message += f"{self.log_level_to_string(level)} "
-        log_message += f"{self.log_level_color(level)}| "
-
-        self._message = log_message
+        self._message = _PREFIX_TEMPLATE.format(
+            ts=get_current_time(),
+            file=os.path.basename(file),
+            func=func,
+            line=line,
+            lvl=self.log_level_to_string(level),
+            color=self.log_level_color(level))
 
     def write(self, message):
-        self._stream.write(self._message + message + COLOR_RESET + "\n")
+        # 整行拼好后用一次os.write写出；小于PIPE_BUF的写入是原子的，
+        # 多线程下不会出现交错的半行日志
+        buf = self._message + message + COLOR_RESET + "\n"
+        os.write(2, buf.encode())
 
     def log_level_to_string(self, level):
-        return {
-            DEBUG: "DEBUG",
-            INFO: "INFO",
-            WARN: "WARN",
-            ERROR: "ERROR",
-            FATAL: "FATAL"
-        }.get(level, "UNKNOWN")
+        if 0 <= level < len(_LEVEL_NAMES):
+            return _LEVEL_NAMES[level]
+        return "UNKNOWN"
 
     def log_level_color(self, level):
-        return {
-            DEBUG: COLOR_DEBUG,
-            INFO: COLOR_INFO,
-            WARN: COLOR_WARN,
-            ERROR: COLOR_ERROR,
-            FATAL: COLOR_FATAL
-        }.get(level, COLOR_RESET)
+        if 0 <= level < len(_LEVEL_COLORS):
+            return _LEVEL_COLORS[level]
+        return COLOR_RESET
 
 def LOG(level):
-    frame = inspect.stack()[1]
-    file = frame.filename
-    line = frame.lineno
-    func = frame.function
-    return LogStream(level, file, line, func)
+    frame = sys._getframe(1)
+    return LogStream(level, frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
 
 def log_debug(message):
-    frame = inspect.stack()[1]
-    LogStream(DEBUG, frame.filename, frame.lineno, frame.function).write(message)
+    if DEBUG < _LEVEL:
+        return
+    frame = sys._getframe(1)
+    LogStream(DEBUG, frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name).write(message)
 
 def log_info(message):
-    frame = inspect.stack()[1]
-    LogStream(INFO, frame.filename, frame.lineno, frame.function).write(message)
+    if INFO < _LEVEL:
+        return
+    frame = sys._getframe(1)
+    LogStream(INFO, frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name).write(message)
 
 def log_warning(message):
-    frame = inspect.stack()[1]
-    LogStream(WARN, frame.filename, frame.lineno, frame.function).write(message)
+    if WARN < _LEVEL:
+        return
+    frame = sys._getframe(1)
+    LogStream(WARN, frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name).write(message)
 
 def log_error(message):
-    frame = inspect.stack()[1]
-    LogStream(ERROR, frame.filename, frame.lineno, frame.function).write(message)
+    if ERROR < _LEVEL:
+        return
+    frame = sys._getframe(1)
+    LogStream(ERROR, frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name).write(message)
 
 def log_fatal(message):
-    frame = inspect.stack()[1]
-    LogStream(FATAL, frame.filename, frame.lineno, frame.function).write(message)
+    if FATAL < _LEVEL:
+        return
+    frame = sys._getframe(1)
+    LogStream(FATAL, frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name).write(message)
@@ -1,54 +1,134 @@
+import aiohttp
+import asyncio
+import orjson
+import re
 import requests
-import pandas as pd
-import time
 import sys
-from openpyxl import load_workbook
+from tqdm import tqdm
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
+
+# 样式对象在openpyxl里是不可变的，构建一次全表复用即可
+BODY_FONT = Font(name="Times New Roman", size=14)
+HEADER_FONT = Font(name="Times New Roman", size=14, bold=True)
+HEADER_FILL = PatternFill(fill_type="solid", start_color="F2F2F2", end_color="F2F2F2")
+BODY_ALIGN = Alignment(horizontal="center", vertical="center", wrap_text=True)
+ABSTRACT_ALIGN = Alignment(horizontal="left", vertical="center", wrap_text=True)
+# 预编译的空白折叠正则，单次线性扫描即可规整摘要
+_WS_RE = re.compile(r"\s+")
+
+THIN_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin"),
+)
 
 class CoRL2024PapersFetcher:
     """
     CoRL 2024论文抓取器，负责从OpenReview API获取论文数据。
     """
-    def __init__(self, output_path, base_url="https://api2.openreview.net/notes", limit=25):
+    def __init__(self, output_path, base_url="https://api2.openreview.net/notes", limit=25,
+                 max_concurrency=6):
         self.output_path = output_path
         self.base_url = base_url
+        self.max_concurrency = max_concurrency
         self.headers = {
             "accept": "application/json",
             "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
         }
         self.params = {
             "content.venue": "CoRL 2024",
-            "details": "replyCount,presentation",
             "domain": "robot-learning.org/CoRL/2024/Conference",
+            # 只取后面会用到的字段，少传字节也少花JSON解析时间
+            "select": "content.title,content.authors,content.abstract,"
+                      "content.video,content.website,content.code,forum",
             "limit": limit,
             "offset": 0
         }
+        # 复用同一个Session，保持连接池和TLS会话，避免每次请求重新握手
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # 限流或服务端出错时指数退避重试，正常响应不额外等待
+        retries = requests.adapters.Retry(
+            total=5, backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=16, pool_maxsize=16, max_retries=retries)
+        self.session.mount("https://", adapter)
         self.papers = []
 
     def fetch_papers(self):
         """
         从OpenReview API抓取CoRL 2024论文数据。
         """
-        while True:
-            print(f"正在请求 offset={self.params['offset']} 的数据...")
-            response = requests.get(self.base_url, headers=self.headers, params=self.params)
-            if response.status_code != 200:
-                print(f"请求失败，状态码：{response.status_code}")
-                break
+        # 先同步请求第一页，拿到论文总数，剩余页并发抓取
+        print("正在请求 offset=0 的数据...")
+        response = self.session.get(self.base_url, params=self.params, timeout=10)
+        if response.status_code != 200:
+            print(f"请求失败，状态码：{response.status_code}")
+            return
 
-            data = response.json()
-            notes = data.get("notes", [])
+        data = orjson.loads(response.content)
+        notes = data.get("notes", [])
+        total = data.get("count", len(notes))
 
-            if not notes:
-                print("已获取所有数据！")
-                break
+        limit = self.params["limit"]
+        offsets = range(limit, total, limit)
+        pages = asyncio.run(self._fetch_pages(offsets))
 
-            self._process_papers(notes)
-            self.params["offset"] += 25  # 更新偏移量，获取下一页数据
-            time.sleep(3)  # 为了避免请求过于频繁，暂停3秒
+        # 按offset顺序合并各页，保持论文编号稳定
+        for page in pages:
+            notes.extend(page)
+        print("已获取所有数据！")
 
+        self._process_papers(notes)
         self._save_papers_to_excel()
 
+    async def _fetch_pages(self, offsets):
+        """
+        并发抓取剩余的分页数据，用信号量限制同时在途的请求数。
+        """
+        sem = asyncio.Semaphore(self.max_concurrency)
+        # 进度条按固定频率刷新，代替每页一条print
+        pbar = tqdm(total=len(offsets), desc="抓取分页", unit="page")
+
+        async def fetch_page(session, offset):
+            params = dict(self.params, offset=offset)
+            async with sem:
+                # 仅在429/5xx时指数退避重试，优先遵循Retry-After
+                backoff = 0.5
+                for _ in range(5):
+                    async with session.get(self.base_url, params=params) as response:
+                        if response.status in (429, 500, 502, 503, 504):
+                            try:
+                                delay = float(response.headers.get("Retry-After", backoff))
+                            except ValueError:
+                                # Retry-After也可能是HTTP日期格式，解析不了就用退避值
+                                delay = backoff
+                            backoff *= 2
+                            await asyncio.sleep(delay)
+                            continue
+                        if response.status != 200:
+                            print(f"请求失败，状态码：{response.status}")
+                            break
+                        data = orjson.loads(await response.read())
+                        pbar.update(1)
+                        return data.get("notes", [])
+                else:
+                    print(f"请求失败，offset={offset} 重试5次后仍未成功，放弃该页")
+                pbar.update(1)
+                return []
+
+        async with aiohttp.ClientSession(headers=self.headers) as session:
+            pages = await asyncio.gather(
+                *[fetch_page(session, offset) for offset in offsets])
+        pbar.close()
+        return pages
+
     def _process_papers(self, notes):
         """
         解析每一篇论文的信息，并添加到 papers 列表中。
@@ -57,7 +137,7 @@ class CoRL2024PapersFetcher:
             content = note.get("content", {})
             authors = content.get("authors", {}).get("value", [])
             abstract = content.get("abstract", {}).get("value", "")
-            abstract = " ".join(abstract.split())  # 清除多余的空格和换行符，确保是一个连续的字符串
+            abstract = _WS_RE.sub(" ", abstract).strip()  # 清除多余的空格和换行符，确保是一个连续的字符串
             self.papers.append({
                 "Id": idx,
                 "Title": content.get("title", {}).get("value", ""),
@@ -71,100 +151,46 @@ class CoRL2024PapersFetcher:
 
     def _save_papers_to_excel(self):
         """
-        将抓取的论文数据保存为Excel文件。
+        用write_only工作簿逐行流式写入，整张表不再驻留内存，
+        样式仍在写入每个单元格时设置。
         """
-        df = pd.DataFrame(self.papers)
-        df.to_excel(self.output_path, index=False)
-        # print(f"数据已保存到 {self.output_path}")
-
+        columns = ["Id", "Title", "Authors", "Abstract", "Video", "Website", "Code", "Original"]
+        abstract_col_index = 4
 
-class ExcelFormatter:
-    """
-    负责格式化Excel文件的类，主要用于设置样式、列宽、行高等。
-    """
-    def __init__(self, output_path):
-        self.output_path = output_path
-        self.wb = load_workbook(output_path)
-        self.ws = self.wb.active
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Papers")
 
-    def format_excel(self):
-        """
-        设置Excel文件的格式，包括列宽、行高、字体、对齐方式等。
-        """
-        self._set_column_widths()
-        self._set_row_heights()
-        self._freeze_header()
-        self._set_font_styles()
-        self._set_borders()
-        self._save_excel()
-
-    def _set_column_widths(self):
-        """
-        设置每列的宽度。
-        """
+        # 列宽与冻结标题行要在追加数据之前设置
         column_widths = [8.38, 35.88, 20, 82.38, 25, 25, 25, 25]
         for i, width in enumerate(column_widths, start=1):
-            column_letter = self.ws.cell(row=1, column=i).column_letter
-            self.ws.column_dimensions[column_letter].width = width
-
-    def _set_row_heights(self):
-        """
-        设置每行的高度。
-        """
-        row_height = 200
-        for row in self.ws.iter_rows():
-            self.ws.row_dimensions[row[0].row].height = row_height
-
-    def _freeze_header(self):
-        """
-        冻结标题行。
-        """
-        self.ws.freeze_panes = "A2"
-        self.ws.row_dimensions[1].height = 26.25
-
-    def _set_font_styles(self):
-        """
-        设置字体样式，包括标题行和其他单元格的字体。
-        """
-        font = Font(name="Times New Roman", size=14)
-        header_font = Font(name="Times New Roman", size=14, bold=True)
-        header_fill = PatternFill(fill_type="solid", start_color="F2F2F2", end_color="F2F2F2")
-
-        for cell in self.ws[1]:
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            cell.fill = header_fill
-
-        for row in self.ws.iter_rows(min_row=2):
-            for cell in row:
-                cell.font = font
-                cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-        abstract_col_index = 4
-        for row in self.ws.iter_rows(min_row=2, min_col=abstract_col_index, max_col=abstract_col_index):
-            for cell in row:
-                cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-
-    def _set_borders(self):
-        """
-        设置单元格边框样式。
-        """
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-
-        for row in self.ws.iter_rows():
-            for cell in row:
-                cell.border = thin_border
-
-    def _save_excel(self):
-        """
-        保存格式化后的Excel文件。
-        """
-        self.wb.save(self.output_path)
+            ws.column_dimensions[get_column_letter(i)].width = width
+        ws.freeze_panes = "A2"
+
+        # 标题行及其样式
+        ws.row_dimensions[1].height = 26.25
+        header = []
+        for col in columns:
+            cell = WriteOnlyCell(ws, value=col)
+            cell.font = HEADER_FONT
+            cell.alignment = BODY_ALIGN
+            cell.fill = HEADER_FILL
+            cell.border = THIN_BORDER
+            header.append(cell)
+        ws.append(header)
+
+        # 数据行：构建好样式的单元格后立即流式写出
+        for row_idx, paper in enumerate(self.papers, start=2):
+            ws.row_dimensions[row_idx].height = 200
+            row = []
+            for col_idx, col in enumerate(columns, start=1):
+                cell = WriteOnlyCell(ws, value=paper[col])
+                cell.font = BODY_FONT
+                cell.alignment = ABSTRACT_ALIGN if col_idx == abstract_col_index else BODY_ALIGN
+                cell.border = THIN_BORDER
+                row.append(cell)
+            ws.append(row)
+
+        wb.save(self.output_path)
         print(f"已设置格式并保存到 {self.output_path}")
 
 
@@ -172,9 +198,6 @@ def main(output_path):
     fetcher = CoRL2024PapersFetcher(output_path)
     fetcher.fetch_papers()
 
-    formatter = ExcelFormatter(output_path)
-    formatter.format_excel()
-
 
 if __name__ == "__main__":
     output_path = sys.argv[1]  # 从命令行参数获取输出文件路径
@@ -1,6 +1,5 @@
 import numpy as np
 from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 
 # 定义词云中的文字内容
 # text = """
@@ -63,15 +62,22 @@ Gantt
 OKR, OKR
 """
 
-# 创建一个圆形的遮罩
-x, y = np.ogrid[:2000, :2000]  # 增加遮罩尺寸
-mask = (x - 1000) ** 2 + (y - 1000) ** 2 > 980 ** 2  # 调整圆的半径
-mask = 255 * mask.astype(int)
+# 函数：创建一个圆形的遮罩，直接生成uint8，省去int64中间数组
+def make_mask(size=2000, radius=980):
+    y, x = np.ogrid[:size, :size]
+    dx = x - size // 2
+    dy = y - size // 2
+    mask = np.where(dx * dx + dy * dy > radius * radius, np.uint8(255), np.uint8(0))
+    # 保证是连续的uint8数组，wordcloud内部就不会再做一次类型转换拷贝
+    return np.ascontiguousarray(mask, dtype=np.uint8)
 
-# 生成词云
-wordcloud = WordCloud(
+# 遮罩和WordCloud对象在模块级只构建一次，重复生成（比如在Jupyter里
+# 换文本重跑）时复用，不再重复算遮罩、解析停用词和扫描字体
+MASK = make_mask()
+
+WC = WordCloud(
     background_color="white",
-    mask=mask,
+    mask=MASK,
     width=2000,  # 增加图像宽度
     height=2000,  # 增加图像高度
     max_words=500,  # 增加显示的单词数量
@@ -80,11 +86,21 @@ wordcloud = WordCloud(
 #    colormap='inferno',  # 使用鲜艳的颜色映射
     colormap='Set1',  # 使用鲜艳的颜色映射
     font_path=None,  # 可以指定字体文件路径，如有需要
-).generate(text)
+)
+
+def main():
+    # matplotlib只在真正要显示时才导入，单纯import本模块不用付启动开销
+    import matplotlib.pyplot as plt
+
+    # 生成词云
+    wordcloud = WC.generate(text)
+
+    # 显示词云
+    plt.figure(figsize=(20, 20))  # 设置图像大小
+    plt.imshow(wordcloud, interpolation='bilinear')
+    plt.axis("off")
+    plt.show()
 
-# 显示词云
-plt.figure(figsize=(20, 20))  # 设置图像大小
-plt.imshow(wordcloud, interpolation='bilinear')
-plt.axis("off")
-plt.show()
+if __name__ == "__main__":
+    main()
 